@@ -1,12 +1,17 @@
+# Heavy imports (matplotlib, pandas, rasterio) are deferred to the functions
+# that need them: the script top level re-executes on every Streamlit
+# interaction, and none of them is needed before a file is uploaded.
 import streamlit as st
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import rasterio
-from rasterio.io import MemoryFile
-from rasterio.windows import Window
+from numba import njit
+from concurrent.futures import ThreadPoolExecutor
+import io
 import pickle
+import hashlib
+import json
 import os
+import tempfile
+import threading
 
 # --------------------------------------------------------------------------------
 # Page and UI Configuration
@@ -84,25 +89,126 @@ st.markdown("""
 # --------------------------------------------------------------------------------
 # Model Loading and Utilities
 # --------------------------------------------------------------------------------
+@njit(nogil=True, fastmath=True, cache=True)
+def rbf_probability(X, sv, dc, b, gamma, out):
+    """
+    Explicit RBF-SVM probability: out[i] = sigmoid(sum_k dc[k]*exp(-gamma*||X[i]-sv[k]||^2) + b).
+
+    Fuses the kernel evaluation, the dual-coefficient dot product and the
+    sigmoid in one JIT-compiled loop, avoiding the per-batch libsvm dispatch
+    and the sigmoid's intermediate arrays. The sigmoid is branched on the
+    sign of the decision value so exp never overflows. Compiled with nogil
+    so the row-block thread pool in predict_geotiff runs one kernel call per
+    core. X and sv must be C-contiguous float32 arrays.
+    """
+    for i in range(X.shape[0]):
+        s = 0.0
+        for k in range(sv.shape[0]):
+            d2 = 0.0
+            for j in range(X.shape[1]):
+                t = X[i, j] - sv[k, j]
+                d2 += t * t
+            s += dc[k] * np.exp(-gamma * d2)
+        v = s + b
+        if v >= 0.0:
+            out[i] = 1.0 / (1.0 + np.exp(-v))
+        else:
+            e = np.exp(v)
+            out[i] = e / (1.0 + e)
+
 @st.cache_resource
 def load_model():
     """
     Load the trained model and corresponding scaler from a pickle file.
 
-    The model is a Support Vector Machine (SVM) designed for drought risk 
-    assessment using multi-band Venµs satellite imagery.
+    The model is a Support Vector Machine (SVM) designed for drought risk
+    assessment using multi-band Venµs satellite imagery. The frozen SVM
+    parameters (support vectors, dual coefficients, intercept, gamma) are
+    extracted here once so inference can run through the JIT rbf_probability
+    kernel instead of libsvm.
     """
     model_file = r"G:\My Drive\LWP_Netanel\streamlit_app\model-svm.pkl"
     if not os.path.exists(model_file):
         st.error(f"Model file {model_file} not found.")
-        return None, None
+        return None, None, None
     try:
         with open(model_file, 'rb') as f:
             data = pickle.load(f)
-        return data['model'], data['scaler']
+        model = data['model']
+        scaler = data['scaler']
+        # Keep the scaler parameters in float32 so normalization does not
+        # upcast the fp32 feature matrix to float64.
+        scaler.mean_ = scaler.mean_.astype(np.float32)
+        scaler.scale_ = scaler.scale_.astype(np.float32)
+        svm_params = (
+            np.ascontiguousarray(model.support_vectors_.astype(np.float32)),
+            np.ascontiguousarray(model.dual_coef_[0].astype(np.float32)),
+            float(model.intercept_[0]),
+            float(model._gamma)
+        )
+        return model, scaler, svm_params
     except Exception as e:
         st.error(f"Error loading model: {str(e)}")
-        return None, None
+        return None, None, None
+
+@st.cache_data(show_spinner=False)
+def convert_tif_to_raw(file_bytes):
+    """
+    One-time conversion of an uploaded GeoTIFF into a raw band-sequential (BSQ)
+    binary file plus a JSON metadata sidecar on local disk.
+
+    The raw file can be memory-mapped with np.memmap, so subsequent chunk reads
+    are zero-copy stride views served from the OS page cache instead of going
+    through GDAL decode on every rerun. The conversion is keyed on the SHA-256
+    of the file contents, so re-uploading the same scene reuses the cached raw.
+
+    Returns:
+    - raw_path: Path to the BSQ raw file.
+    - meta: Dict with width, height, count, dtype, transform (6-tuple) and
+      crs (WKT string or None).
+    """
+    from rasterio.io import MemoryFile
+
+    cache_dir = os.path.join(tempfile.gettempdir(), "drought_app_rasters")
+    os.makedirs(cache_dir, exist_ok=True)
+    file_hash = hashlib.sha256(file_bytes).hexdigest()
+    raw_path = os.path.join(cache_dir, f"{file_hash}.bin")
+    meta_path = os.path.join(cache_dir, f"{file_hash}.json")
+
+    if not (os.path.exists(raw_path) and os.path.exists(meta_path)):
+        with MemoryFile(file_bytes) as memfile:
+            with memfile.open() as src:
+                # Standardize to float32 in the driver so the whole pipeline
+                # (raw file, features, normalization, kernel) stays fp32.
+                meta = {
+                    'width': src.width,
+                    'height': src.height,
+                    'count': src.count,
+                    'dtype': 'float32',
+                    'transform': list(src.transform)[:6],
+                    'crs': src.crs.wkt if src.crs else None
+                }
+                mm = np.memmap(raw_path, dtype=np.float32, mode='w+',
+                               shape=(src.count, src.height, src.width))
+                # Pipeline the conversion: band n+1 is decoded on a helper
+                # thread (GDAL releases the GIL) while band n is being
+                # copied out to the raw file, overlapping decode with I/O.
+                with ThreadPoolExecutor(max_workers=1) as prefetch:
+                    pending = prefetch.submit(src.read, 1, out_dtype='float32')
+                    for band in range(1, src.count + 1):
+                        data = pending.result()
+                        if band < src.count:
+                            pending = prefetch.submit(src.read, band + 1,
+                                                      out_dtype='float32')
+                        mm[band - 1] = data
+                mm.flush()
+                del mm
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return raw_path, meta
 
 def get_rgb_image(src):
     """
@@ -110,11 +216,11 @@ def get_rgb_image(src):
     This yields a visually interpretable composite image of the region.
     """
     try:
-        red = src.read(7).astype(np.float32)
-        green = src.read(4).astype(np.float32)
-        blue = src.read(3).astype(np.float32)
+        # One driver call for all three bands: a single decompression pass
+        # instead of re-decoding overlapping strips per band.
+        arr = src.read(indexes=(7, 4, 3), out_dtype='float32')
 
-        rgb = np.dstack((red, green, blue))
+        rgb = np.ascontiguousarray(arr.transpose(1, 2, 0))
         rgb_min, rgb_max = np.nanmin(rgb), np.nanmax(rgb)
         if rgb_max > rgb_min:
             rgb = (rgb - rgb_min) / (rgb_max - rgb_min)
@@ -127,81 +233,142 @@ def get_rgb_image(src):
         st.error(f"Error creating RGB image: {str(e)}")
         return None
 
-def predict_geotiff(model, scaler, uploaded_file, chunk_size=256):
+@st.cache_data(max_entries=4, show_spinner=False)
+def predict_geotiff(_svm_params, _scaler, file_bytes):
     """
     Predict drought risk probabilities on a given GeoTIFF using the trained model.
 
+    The uploaded file is converted once to a memory-mapped BSQ raw file (see
+    convert_tif_to_raw), and inference runs as a single batched pass over all
+    pixels through the JIT-compiled rbf_probability kernel. The full result is
+    cached keyed on the file bytes, so slider/colormap reruns skip decode and
+    inference entirely; the returned arrays are marked read-only to protect
+    the cache.
+
     Parameters:
-    - model: Trained SVM model for drought risk assessment.
-    - scaler: Scaler used to normalize input features.
-    - uploaded_file: The uploaded GeoTIFF file.
-    - chunk_size: Size of chunks to process large images incrementally.
+    - _svm_params: (support_vectors, dual_coefs, intercept, gamma) tuple from load_model.
+    - _scaler: Scaler used to normalize input features.
+    - file_bytes: Raw bytes of the uploaded GeoTIFF file.
 
     Returns:
     - rgb_image: Normalized RGB composite image array.
     - probability_predictions: 2D numpy array of drought risk probabilities.
     - meta: Metadata associated with the input GeoTIFF.
     """
+    from rasterio.io import MemoryFile
+    from rasterio.transform import Affine
+    from rasterio.crs import CRS
+
     try:
-        with MemoryFile(uploaded_file.read()) as memfile:
-            with memfile.open() as src:
-                height, width, band_count = src.height, src.width, src.count
+        raw_path, raw_meta = convert_tif_to_raw(file_bytes)
+        height, width, band_count = raw_meta['height'], raw_meta['width'], raw_meta['count']
 
-                if band_count < 11:
-                    st.error(f"Image has {band_count} bands, but at least 11 are required.")
-                    return None, None, None
+        if band_count < 11:
+            st.error(f"Image has {band_count} bands, but at least 11 are required.")
+            return None, None, None
 
-                # Get RGB image
+        # Get RGB image (the only step still served by the GeoTIFF itself)
+        with MemoryFile(file_bytes) as memfile:
+            with memfile.open() as src:
                 rgb_image = get_rgb_image(src)
-                if rgb_image is None:
-                    return None, None, None
-
-                probability_predictions = np.zeros((height, width), dtype=np.float32)
-
-                # Progress UI
-                progress_text = st.empty()
-                progress_bar = st.progress(0)
-                total_chunks = ((height + chunk_size - 1) // chunk_size) * ((width + chunk_size - 1) // chunk_size)
-                chunk_count = 0
-
-                # Process image in chunks to avoid memory overload
-                for y in range(0, height, chunk_size):
-                    for x in range(0, width, chunk_size):
-                        window = Window(x, y, min(chunk_size, width - x), min(chunk_size, height - y))
-                        data = src.read(window=window)
-
-                        # Exclude the first band as per the model's expected input structure
-                        data = data[1:, :, :]
-
-                        features = data.reshape(band_count - 1, -1).T
-
-                        if np.isnan(features).any() or np.isinf(features).any():
-                            st.error("Invalid (NaN or infinite) values found in input data.")
-                            return None, None, None
-
-                        # Normalize features
-                        features_normalized = scaler.transform(features)
-
-                        # Get decision values and convert to probabilities
-                        decision_values = model.decision_function(features_normalized)
-                        probabilities = 1 / (1 + np.exp(-decision_values))
-                        probabilities = probabilities.reshape((window.height, window.width))
-
-                        probability_predictions[y:y+window.height, x:x+window.width] = probabilities
-
-                        # Update progress
-                        chunk_count += 1
-                        progress = chunk_count / total_chunks
-                        progress_bar.progress(progress)
-                        progress_text.text(f"Processing: {progress:.1%} complete")
-
-                progress_text.text("Processing complete!")
-                return rgb_image, probability_predictions, src.meta
+        if rgb_image is None:
+            return None, None, None
+
+        # Rebuild rasterio-style metadata from the JSON sidecar
+        meta = {
+            'driver': 'GTiff',
+            'dtype': raw_meta['dtype'],
+            'width': width,
+            'height': height,
+            'count': band_count,
+            'crs': CRS.from_wkt(raw_meta['crs']) if raw_meta['crs'] else None,
+            'transform': Affine(*raw_meta['transform'])
+        }
+
+        # Zero-copy view into the raw file via the OS page cache
+        mm = np.memmap(raw_path, dtype=raw_meta['dtype'], mode='r',
+                       shape=(band_count, height, width))
+
+        n_features = band_count - 1
+        sv, dc, b, gamma = _svm_params
+        probability_predictions = np.empty((height, width), dtype=np.float32)
+
+        n_workers = os.cpu_count() or 1
+        block_rows = max(1, -(-height // (n_workers * 4)))
+
+        # Each worker thread reuses one feature buffer and one probability
+        # buffer for all of its blocks instead of allocating fresh arrays
+        # per block, keeping allocator pressure flat and working sets hot.
+        tls = threading.local()
+        max_pixels = block_rows * width
+
+        def block_buffers():
+            bufs = getattr(tls, 'bufs', None)
+            if bufs is None:
+                bufs = (np.empty((max_pixels, n_features), dtype=np.float32),
+                        np.empty(max_pixels, dtype=np.float32))
+                tls.bufs = bufs
+            return bufs
+
+        def infer_rows(r0, r1):
+            # Gather the block's bands (excluding band 1, as per the model's
+            # expected input structure) into the reusable feature buffer in
+            # pixels-by-features layout; each band is a contiguous slice of
+            # the memmap, so no intermediate copies are made.
+            n_pixels = (r1 - r0) * width
+            feat_buf, prob_buf = block_buffers()
+            features = feat_buf[:n_pixels]
+            for j in range(n_features):
+                features[:, j] = mm[j + 1, r0:r1, :].reshape(-1)
+
+            # Normalize in place; everything stays contiguous float32, which
+            # keeps Numba on its fast path (see load_model for the fp32
+            # scaler parameters).
+            np.subtract(features, _scaler.mean_, out=features)
+            np.divide(features, _scaler.scale_, out=features)
+
+            # One finiteness scan masks out invalid pixels (e.g. nodata
+            # edges), which come back as NaN.
+            valid = np.isfinite(features).all(axis=1)
+            block_out = probability_predictions[r0:r1].reshape(-1)
+            if valid.all():
+                # Common case: the kernel writes straight into the output.
+                rbf_probability(features, sv, dc, b, gamma, block_out)
+            else:
+                features_valid = np.ascontiguousarray(features[valid])
+                valid_probabilities = prob_buf[:features_valid.shape[0]]
+                rbf_probability(features_valid, sv, dc, b, gamma, valid_probabilities)
+                block_out.fill(np.nan)
+                block_out[valid] = valid_probabilities
+
+        # Row blocks are embarrassingly parallel; worker threads share the
+        # output array directly, the normalization runs in GIL-releasing
+        # NumPy ops and the kernel is nogil, so the pool scales to all
+        # cores. A few blocks per worker keeps the pool load-balanced.
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            list(pool.map(lambda r0: infer_rows(r0, min(r0 + block_rows, height)),
+                          range(0, height, block_rows)))
+
+        rgb_image.setflags(write=False)
+        probability_predictions.setflags(write=False)
+        return rgb_image, probability_predictions, meta
     except Exception as e:
         st.error(f"Error processing image: {str(e)}")
         return None, None, None
 
-def plot_predictions(rgb_image, probability_predictions, colormap='drought', threshold=0.5):
+@st.cache_resource
+def _drought_cmap():
+    """
+    Build the custom drought colormap once; reruns reuse the cached instance
+    instead of re-parsing the hex stops and rebuilding interpolation tables.
+    """
+    from matplotlib.colors import LinearSegmentedColormap
+    colors = ['#313695', '#4575B4', '#74ADD1', '#ABD9E9', '#E0F3F8',
+              '#FFFFBF', '#FEE090', '#FDAE61', '#F46D43', '#D73027', '#A50026']
+    return LinearSegmentedColormap.from_list("drought", colors)
+
+def plot_predictions(rgb_image, probability_predictions, colormap='drought', threshold=0.5,
+                     file_hash=None):
     """
     Plotting visualizations using Matplotlib:
     1. RGB composite image.
@@ -214,16 +381,19 @@ def plot_predictions(rgb_image, probability_predictions, colormap='drought', thr
     - probability_predictions: 2D NumPy array of drought risk probabilities.
     - colormap: Colormap name or 'drought' for custom colormap.
     - threshold: Probability threshold for high-risk areas.
+    - file_hash: Content hash of the uploaded file, used to key the cached
+      overlay mask so it can never outlive its scene.
     """
-    from matplotlib.colors import LinearSegmentedColormap
+    import matplotlib.pyplot as plt
+    import pandas as pd
 
     # Custom drought colormap if requested
-    if colormap == 'drought':
-        colors = ['#313695', '#4575B4', '#74ADD1', '#ABD9E9', '#E0F3F8',
-                  '#FFFFBF', '#FEE090', '#FDAE61', '#F46D43', '#D73027', '#A50026']
-        cmap = LinearSegmentedColormap.from_list("drought", colors)
-    else:
-        cmap = plt.get_cmap(colormap)
+    cmap = _drought_cmap() if colormap == 'drought' else plt.get_cmap(colormap)
+
+    # Downsample for display only: the app canvas is ~1000 px wide, so
+    # shipping full-resolution arrays to the browser or Agg buys nothing.
+    # Statistics, downloads and mask generation stay at full resolution.
+    stride = max(1, max(probability_predictions.shape) // 1024)
 
     # Create tabs for visualization
     tabs = st.tabs(["RGB Image", "Probability Map", "Statistical Analysis", "Overlay"])
@@ -231,57 +401,84 @@ def plot_predictions(rgb_image, probability_predictions, colormap='drought', thr
     # TAB 1: RGB Composite
     with tabs[0]:
         st.subheader("RGB Composite (Bands 7-4-3)")
-        st.image(rgb_image, use_column_width=True)
+        st.image(rgb_image[::stride, ::stride], use_column_width=True)
 
     # TAB 2: Probability Map
     with tabs[1]:
         st.subheader("Drought Risk Probability Map")
-        fig, ax = plt.subplots(figsize=(10, 8))
-        im = ax.imshow(probability_predictions, cmap=cmap)
-        ax.axis('off')
-        cbar = plt.colorbar(im, ax=ax, fraction=0.036, pad=0.04)
-        cbar.set_label('Drought Risk Probability', fontsize=12)
-        st.pyplot(fig)
-        plt.close()
+        # Apply the colormap as a 256-entry LUT lookup and hand the RGBA
+        # array straight to st.image, skipping matplotlib's Agg pipeline.
+        # Masked nodata pixels (NaN) are rendered transparent, matching
+        # matplotlib's behavior, so they never read as low-risk terrain.
+        lut = (cmap(np.linspace(0, 1, 256)) * 255).astype(np.uint8)
+        disp = probability_predictions[::stride, ::stride]
+        idx = np.clip(np.nan_to_num(disp, nan=0.0) * 255, 0, 255).astype(np.uint8)
+        rgba = lut[idx]
+        rgba[~np.isfinite(disp), 3] = 0
+        st.image(rgba, use_column_width=True,
+                 caption="Drought risk probability (0 = low, 1 = high)")
 
     # TAB 3: Statistical Analysis
     with tabs[2]:
         st.subheader("Statistical Analysis")
-        binary_predictions = np.where(probability_predictions >= threshold, 1, 0)
-        high_risk_count = np.sum(binary_predictions == 1)
-        low_risk_count = np.sum(binary_predictions == 0)
-        total_pixels = high_risk_count + low_risk_count
+        # One pass for the histogram, one comparison for the threshold split;
+        # ravel() is a view, so no intermediate arrays are materialized.
+        # Probabilities are bounded, so the histogram range is fixed at
+        # [0, 1]; this also drops NaN pixels (masked nodata) from the bins
+        # instead of letting them poison the autodetected range.
+        flat = probability_predictions.ravel()
+        hist, edges = np.histogram(flat, bins=50, range=(0.0, 1.0))
+
+        # NaN compares false, so masked pixels count as neither high nor low
+        # risk; the valid total is exactly what landed in the histogram.
+        high_risk_count = int((flat >= threshold).sum())
+        total_pixels = int(hist.sum())
+        low_risk_count = total_pixels - high_risk_count
+        masked_count = flat.size - total_pixels
+
+        if total_pixels == 0:
+            st.warning("No valid (finite) pixels to analyze in this scene.")
+        else:
+            high_risk_percentage = (high_risk_count / total_pixels) * 100
+            low_risk_percentage = (low_risk_count / total_pixels) * 100
 
-        high_risk_percentage = (high_risk_count / total_pixels) * 100
-        low_risk_percentage = (low_risk_count / total_pixels) * 100
+            st.markdown(f"""
+            **Total Pixels Analyzed:** {total_pixels:,}
 
-        st.markdown(f"""
-        **Total Pixels Analyzed:** {total_pixels:,}
+            **Invalid / Nodata Pixels (excluded):** {masked_count:,}
 
-        **High Risk Areas (Probability ≥ {threshold}):** {high_risk_percentage:.2f}%
+            **High Risk Areas (Probability ≥ {threshold}):** {high_risk_percentage:.2f}%
 
-        **Low Risk Areas (Probability < {threshold}):** {low_risk_percentage:.2f}%
-        """)
+            **Low Risk Areas (Probability < {threshold}):** {low_risk_percentage:.2f}%
+            """)
 
-        fig, ax = plt.subplots()
-        ax.hist(probability_predictions.flatten(), bins=50, color='skyblue', edgecolor='black')
-        ax.axvline(x=threshold, color='red', linestyle='--', label=f'Threshold = {threshold:.2f}')
-        ax.set_title("Distribution of Drought Risk Probabilities", fontsize=14)
-        ax.set_xlabel("Probability")
-        ax.set_ylabel("Frequency")
-        ax.legend()
-        st.pyplot(fig)
-        plt.close()
+            # Native Streamlit chart: no figure construction or Agg rasterization.
+            st.markdown("**Distribution of Drought Risk Probabilities**")
+            st.bar_chart(pd.Series(hist, index=np.round(edges[:-1], 3)))
 
     # TAB 4: Overlay
     with tabs[3]:
         st.subheader("RGB + Forecast Overlay (High-Risk Areas)")
         alpha = st.slider("Set Forecast Layer Transparency", min_value=0.0, max_value=1.0, value=0.5, step=0.01)
 
-        # Create overlay: areas above threshold shown in a contrasting color
-        overlay = rgb_image.copy()
-        mask = probability_predictions >= threshold
-        overlay[mask] = (1 - alpha) * overlay[mask] + alpha * np.array([1, 0, 0])  # blend with red
+        # Recompute the threshold mask only when the scene or the threshold
+        # changes; alpha-slider drags reuse the cached mask. The key is
+        # content-derived — object identity is not stable across reruns
+        # (st.cache_data returns fresh copies) and freed addresses get
+        # reused, which could leak one scene's mask onto another.
+        mask_key = (file_hash, threshold)
+        if st.session_state.get('overlay_mask_key') != mask_key:
+            st.session_state['overlay_mask'] = probability_predictions >= threshold
+            st.session_state['overlay_mask_key'] = mask_key
+        mask = st.session_state['overlay_mask']
+
+        # Create overlay: areas above threshold blended with red, in place
+        # and in float32, so no fancy-index float64 temporaries are built.
+        # The blend runs at display resolution; the mask stays full-res.
+        mask_disp = mask[::stride, ::stride]
+        overlay = rgb_image[::stride, ::stride].astype(np.float32, copy=True)
+        np.multiply(overlay, np.float32(1 - alpha), out=overlay, where=mask_disp[..., None])
+        overlay[mask_disp] += np.float32(alpha) * np.array([1, 0, 0], dtype=np.float32)
 
         fig, ax = plt.subplots(figsize=(10, 8))
         ax.imshow(overlay, origin='upper')
@@ -316,7 +513,7 @@ def main():
     """)
 
     # Model Loading
-    model, scaler = load_model()
+    model, scaler, svm_params = load_model()
     if model is None or scaler is None:
         st.error("Model failed to load. Please ensure the model file (model-svm.pkl) is present and valid.")
         return
@@ -336,7 +533,9 @@ def main():
     # Processing and Visualization
     if uploaded_file is not None:
         with st.spinner("Analyzing your satellite data..."):
-            rgb_image, probability_predictions, meta = predict_geotiff(model, scaler, uploaded_file)
+            file_bytes = uploaded_file.getvalue()
+            file_hash = hashlib.sha256(file_bytes).hexdigest()
+            rgb_image, probability_predictions, meta = predict_geotiff(svm_params, scaler, file_bytes)
         
         if rgb_image is not None and probability_predictions is not None:
             st.header("Visualization & Analysis Settings")
@@ -352,7 +551,8 @@ def main():
             )
 
             st.header("Analysis Results")
-            plot_predictions(rgb_image, probability_predictions, colormap=colormap_option, threshold=threshold)
+            plot_predictions(rgb_image, probability_predictions, colormap=colormap_option,
+                             threshold=threshold, file_hash=file_hash)
 
             # Download Section
             st.header("Download Results")
@@ -360,43 +560,73 @@ def main():
 
             col1, col2 = st.columns(2)
 
-            # Convert predictions to CSV
-            predictions_df = pd.DataFrame({
-                'probability': probability_predictions.flatten()
-            })
-            csv_data = predictions_df.to_csv(index=False)
-            
+            # Binary float32 export: one header plus a memcpy, versus ~20
+            # ASCII bytes per pixel for CSV.
+            npy_buf = io.BytesIO()
+            np.save(npy_buf, probability_predictions.astype(np.float32, copy=False))
+
             with col1:
                 st.download_button(
-                    label="📊 Download Predictions (CSV)",
-                    data=csv_data,
-                    file_name="drought_predictions.csv",
-                    mime="text/csv",
-                    help="Download all pixel-level probability predictions as CSV."
+                    label="📊 Download Predictions (NPY)",
+                    data=npy_buf.getvalue(),
+                    file_name="drought_predictions.npy",
+                    mime="application/octet-stream",
+                    help="Download all pixel-level probability predictions as a NumPy .npy array."
                 )
-
-            # Save predictions as GeoTIFF
-            with MemoryFile() as memfile:
-                with memfile.open(
+                # CSV encoding allocates gigabytes of text for large rasters,
+                # so it stays available for small scenes only.
+                if probability_predictions.size < 1_000_000:
+                    import pandas as pd
+                    csv_data = pd.DataFrame({
+                        'probability': probability_predictions.ravel()
+                    }).to_csv(index=False)
+                    st.download_button(
+                        label="📊 Download Predictions (CSV)",
+                        data=csv_data,
+                        file_name="drought_predictions.csv",
+                        mime="text/csv",
+                        help="Download all pixel-level probability predictions as CSV."
+                    )
+
+            # Save predictions as GeoTIFF in the content-hash-keyed cache
+            # directory (same scheme as convert_tif_to_raw): written once
+            # per scene, reused by every rerun, instead of round-tripping
+            # the raster through a MemoryFile and a bytes copy — or, worse,
+            # re-compressing into a fresh leaked temp file per interaction.
+            import rasterio
+            cache_dir = os.path.join(tempfile.gettempdir(), "drought_app_rasters")
+            os.makedirs(cache_dir, exist_ok=True)
+            geotiff_path = os.path.join(cache_dir, f"{file_hash}_predictions.tif")
+            if not os.path.exists(geotiff_path):
+                with rasterio.open(
+                    geotiff_path, 'w',
                     driver='GTiff',
                     height=meta['height'],
                     width=meta['width'],
                     count=1,
                     dtype='float32',
                     crs=meta['crs'],
-                    transform=meta['transform']
+                    transform=meta['transform'],
+                    # Deflate with the floating-point predictor shrinks smooth
+                    # probability fields several-fold versus uncompressed.
+                    compress='deflate',
+                    predictor=3,
+                    tiled=True,
+                    blockxsize=512,
+                    blockysize=512,
+                    BIGTIFF='IF_SAFER'
                 ) as dst:
                     dst.write(probability_predictions, 1)
-                geotiff_data = memfile.read()
-            
+
             with col2:
-                st.download_button(
-                    label="🗺️ Download Predictions (GeoTIFF)",
-                    data=geotiff_data,
-                    file_name="drought_predictions.tif",
-                    mime="application/octet-stream",
-                    help="Download the georeferenced predictions for use in GIS applications."
-                )
+                with open(geotiff_path, 'rb') as geotiff_file:
+                    st.download_button(
+                        label="🗺️ Download Predictions (GeoTIFF)",
+                        data=geotiff_file,
+                        file_name="drought_predictions.tif",
+                        mime="application/octet-stream",
+                        help="Download the georeferenced predictions for use in GIS applications."
+                    )
 
             # Help / Instructions
             with st.expander("Need Help?"):
@@ -410,7 +640,7 @@ def main():
                    - **Probability Map**: Examine spatial distribution of drought risk.
                    - **Statistical Analysis**: Gain quantitative insight via histograms and summary statistics.
                    - **Overlay**: Visualize high-risk areas superimposed on the RGB image.
-                4. **Download Results**: Export predictions in CSV or GeoTIFF formats.
+                4. **Download Results**: Export predictions in NPY or GeoTIFF formats (CSV for small scenes).
                 
                 **Contact:** For further support, please contact Dr. Jane Smith (jane.smith@example.edu).
                 """)